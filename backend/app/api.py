@@ -1,9 +1,18 @@
 """FastAPI routes for PromptLab"""
 
-from fastapi import FastAPI, HTTPException
+import gzip
+from dataclasses import dataclass
+from functools import lru_cache
+
+import orjson
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
 
 from app import __version__
+from app.middleware import ETagMiddleware
 from app.models import (
     AssignTagsRequest,
     Collection,
@@ -24,19 +33,22 @@ from app.models import (
 )
 from app.storage import storage
 from app.utils import (
-    filter_prompts_by_collection,
-    filter_prompts_by_tags,
-    search_prompts,
+    etag_matches,
+    make_etag,
     slug_from_name,
-    sort_prompts_by_date,
 )
 
 app = FastAPI(
     title="PromptLab API",
     description="AI Prompt Engineering Platform",
     version=__version__,
+    default_response_class=ORJSONResponse,
 )
 
+# Route handlers are declared ``async``: storage is in-memory and never blocks,
+# so they run directly on the event loop instead of hopping to the threadpool.
+# Any future blocking I/O (e.g. a real database driver) must be awaited.
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -46,6 +58,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Conditional GET support (ETag / If-None-Match -> 304)
+app.add_middleware(ETagMiddleware)
+
+# Response compression. Added after ETagMiddleware so it wraps it: ETags are
+# computed on the uncompressed body and 304 responses skip compression.
+# Cached bodies are compressed once and sent pre-encoded, which the middleware
+# passes through. A low level keeps per-request compression cheap; level 9
+# is several times slower for only slightly smaller JSON.
+_GZIP_MINIMUM_SIZE = 512
+_GZIP_LEVEL = 5
+app.add_middleware(
+    GZipMiddleware, minimum_size=_GZIP_MINIMUM_SIZE, compresslevel=_GZIP_LEVEL
+)
+
 
 def _validate_tag_ids(tag_ids: list[str]) -> None:
     """Raise HTTPException 400 if any tag id is not found."""
@@ -68,11 +94,109 @@ def _get_prompt_or_404(prompt_id: str) -> Prompt:
     return prompt
 
 
+def _model_response(model: BaseModel, status_code: int = 200) -> Response:
+    """Serialize an already-validated model straight to a JSON response.
+
+    ``model_dump_json`` encodes in pydantic-core, bypassing FastAPI's response
+    validation and ``jsonable_encoder`` pass.
+    """
+    return Response(
+        model.model_dump_json(), status_code=status_code, media_type="application/json"
+    )
+
+
+@dataclass(slots=True)
+class _CachedBody:
+    """A serialized JSON body, its ETag and, once requested, its gzip encoding."""
+
+    body: bytes
+    etag: str
+    gzipped: bytes | None = None
+
+    @classmethod
+    def from_body(cls, body: bytes) -> "_CachedBody":
+        """Wraps a serialized body, deriving its ETag."""
+        return cls(body, make_etag(body))
+
+
+def _cached_json_response(request: Request, cached: _CachedBody) -> Response:
+    """Return pre-serialized JSON, or an empty 304 if the client's copy is current.
+
+    Clients that accept gzip get the cached compressed body, so repeat reads
+    are not recompressed.
+    """
+    headers = {"ETag": cached.etag}
+    if etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers=headers)
+    accepts_gzip = "gzip" in request.headers.get("accept-encoding", "")
+    if accepts_gzip and len(cached.body) >= _GZIP_MINIMUM_SIZE:
+        if cached.gzipped is None:
+            cached.gzipped = gzip.compress(cached.body, compresslevel=_GZIP_LEVEL)
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+        return Response(cached.gzipped, media_type="application/json", headers=headers)
+    return Response(cached.body, media_type="application/json", headers=headers)
+
+
+@lru_cache(maxsize=4096)
+def _prompt_body(prompt_id: str, rev: int) -> _CachedBody:
+    """Build the serialized prompt and its ETag for a prompt revision.
+
+    Revisions are never reused, so an entry can never be served stale; entries
+    for updated or deleted prompts simply age out of the LRU cache.
+    """
+    body = storage.get_prompt(prompt_id).model_dump_json().encode()
+    return _CachedBody.from_body(body)
+
+
+@lru_cache(maxsize=64)
+def _prompt_list_body(
+    version: int,
+    collection_id: str | None,
+    search: str | None,
+    tag_ids: tuple[str, ...],
+    match_all: bool,
+) -> _CachedBody:
+    """Build the serialized prompt list and its ETag for a storage version.
+
+    ``version`` is only a cache key: every prompt write bumps
+    ``storage.prompts_version``, so stale entries are never hit again and
+    simply age out of the LRU cache. The other arguments must already be
+    normalized so equivalent queries share one entry.
+    """
+    records = storage.get_prompt_records(collection_id, search, tag_ids, match_all)
+    # Stored prompts are already validated, so encode their fields directly
+    # instead of building a Prompt per row. OPT_UTC_Z writes UTC datetimes
+    # with a "Z" suffix, as pydantic does.
+    body = orjson.dumps(
+        {"prompts": records, "total": len(records)}, option=orjson.OPT_UTC_Z
+    )
+    return _CachedBody.from_body(body)
+
+
+@lru_cache(maxsize=8)
+def _collection_list_body(version: int) -> _CachedBody:
+    """Build the serialized collection list and its ETag for a storage version."""
+    collections = storage.get_all_collections()
+    result = CollectionList.model_construct(
+        collections=collections, total=len(collections)
+    )
+    body = result.model_dump_json().encode()
+    return _CachedBody.from_body(body)
+
+
+@lru_cache(maxsize=1024)
+def _collection_body(collection_id: str, version: int) -> _CachedBody:
+    """Build the serialized collection and its ETag for a storage version."""
+    body = storage.get_collection(collection_id).model_dump_json().encode()
+    return _CachedBody.from_body(body)
+
+
 # ============== Health Check ==============
 
 
 @app.get("/health", response_model=HealthResponse)
-def health_check():
+async def health_check():
     """Check the health of the API service.
 
     Returns:
@@ -85,7 +209,8 @@ def health_check():
 
 
 @app.get("/prompts", response_model=PromptList)
-def list_prompts(
+async def list_prompts(
+    request: Request,
     collection_id: str | None = None,
     search: str | None = None,
     tag_ids: str | None = None,
@@ -100,43 +225,44 @@ def list_prompts(
         tag_match: If 'any', prompt may have any of the tags (OR). Default: all (AND).
 
     Returns:
-        PromptList: A list of prompts and the total count.
+        PromptList: A list of prompts and the total count. The serialized body
+        is cached until the next prompt write.
     """
-    prompts = storage.get_all_prompts()
-    if collection_id:
-        prompts = filter_prompts_by_collection(prompts, collection_id)
-    if search:
-        prompts = search_prompts(prompts, search)
-    if tag_ids:
-        ids = [tid.strip() for tid in tag_ids.split(",") if tid.strip()]
-        if ids:
-            match_all = tag_match != "any"
-            prompts = filter_prompts_by_tags(prompts, ids, match_all=match_all)
-    prompts = sort_prompts_by_date(prompts, descending=True)
-    return PromptList(prompts=prompts, total=len(prompts))
+    ids = tuple(tid.strip() for tid in (tag_ids or "").split(",") if tid.strip())
+    # tag_match only matters when there are tags to match
+    match_all = tag_match != "any" if ids else True
+    cached = _prompt_list_body(
+        storage.prompts_version, collection_id or None, search or None, ids, match_all
+    )
+    return _cached_json_response(request, cached)
 
 
 @app.get("/prompts/{prompt_id}", response_model=Prompt)
-def get_prompt(prompt_id: str):
+async def get_prompt(prompt_id: str, request: Request):
     """Retrieve a specific prompt by its ID.
 
+    Supports conditional requests: if the client's If-None-Match header
+    matches the current ETag, an empty 304 response is returned.
+
     Args:
         prompt_id (str): The ID of the prompt to retrieve.
 
     Returns:
-        Prompt: The prompt object if found.
+        Prompt: The prompt object if found. The serialized body is cached
+        until the prompt next changes.
 
     Raises:
         HTTPException: If the prompt is not found.
     """
-    prompt = storage.get_prompt(prompt_id)
-    if prompt is None:
+    rev = storage.get_prompt_revision(prompt_id)
+    if rev is None:
         raise HTTPException(status_code=404, detail="Prompt not found")
-    return prompt
+    cached = _prompt_body(prompt_id, rev)
+    return _cached_json_response(request, cached)
 
 
 @app.post("/prompts", response_model=Prompt, status_code=201)
-def create_prompt(prompt_data: PromptCreate):
+async def create_prompt(prompt_data: PromptCreate):
     """Create a new prompt.
 
     Args:
@@ -153,11 +279,11 @@ def create_prompt(prompt_data: PromptCreate):
     tag_ids = getattr(prompt_data, "tag_ids", None) or []
     _validate_tag_ids(tag_ids)
     prompt = Prompt(**prompt_data.model_dump())
-    return storage.create_prompt(prompt)
+    return _model_response(storage.create_prompt(prompt), status_code=201)
 
 
 @app.put("/prompts/{prompt_id}", response_model=Prompt)
-def update_prompt(prompt_id: str, prompt_data: PromptUpdate):
+async def update_prompt(prompt_id: str, prompt_data: PromptUpdate):
     """Update a prompt by its ID.
 
     Args:
@@ -190,11 +316,11 @@ def update_prompt(prompt_id: str, prompt_data: PromptUpdate):
         created_at=existing.created_at,
         updated_at=get_current_time(),
     )
-    return storage.update_prompt(prompt_id, updated_prompt)
+    return _model_response(storage.update_prompt(prompt_id, updated_prompt))
 
 
 @app.patch("/prompts/{prompt_id}", response_model=Prompt)
-def patch_prompt(prompt_id: str, prompt_data: PromptPatch):
+async def patch_prompt(prompt_id: str, prompt_data: PromptPatch):
     """Partially update a prompt by its ID.
 
     Args:
@@ -210,24 +336,27 @@ def patch_prompt(prompt_id: str, prompt_data: PromptPatch):
     existing = storage.get_prompt(prompt_id)
     if not existing:
         raise HTTPException(status_code=404, detail="Prompt not found")
-    update_data = existing.model_dump()
-    patch_dict = prompt_data.model_dump(exclude_unset=True)
-    for field, value in patch_dict.items():
-        if field == "collection_id" and value:
-            _ensure_collection_exists(value)
-            update_data[field] = value
-        elif field == "tag_ids" and value is not None:
-            _validate_tag_ids(value)
-            update_data[field] = value
-        elif value is not None and value != "":
-            update_data[field] = value
-    update_data["updated_at"] = get_current_time()
-    updated_prompt = Prompt(**update_data)
-    return storage.update_prompt(prompt_id, updated_prompt)
+    # Null and empty-string values leave the existing field unchanged
+    changes = {
+        field: value
+        for field, value in prompt_data.model_dump(
+            exclude_unset=True, exclude_none=True
+        ).items()
+        if value != ""
+    }
+    if "collection_id" in changes:
+        _ensure_collection_exists(changes["collection_id"])
+    if "tag_ids" in changes:
+        _validate_tag_ids(changes["tag_ids"])
+    # Patch fields are already validated by PromptPatch; copy without re-validating
+    updated_prompt = existing.model_copy(
+        update={**changes, "updated_at": get_current_time()}
+    )
+    return _model_response(storage.update_prompt(prompt_id, updated_prompt))
 
 
 @app.delete("/prompts/{prompt_id}", status_code=204)
-def delete_prompt(prompt_id: str):
+async def delete_prompt(prompt_id: str):
     """Delete a prompt by its ID.
 
     Args:
@@ -244,37 +373,42 @@ def delete_prompt(prompt_id: str):
 
 
 @app.get("/collections", response_model=CollectionList)
-def list_collections():
+async def list_collections(request: Request):
     """List all collections.
 
     Returns:
-        CollectionList: A list of collections and the total count.
+        CollectionList: A list of collections and the total count. The
+        serialized body is cached until the next collection write.
     """
-    collections = storage.get_all_collections()
-    return CollectionList(collections=collections, total=len(collections))
+    cached = _collection_list_body(storage.collections_version)
+    return _cached_json_response(request, cached)
 
 
 @app.get("/collections/{collection_id}", response_model=Collection)
-def get_collection(collection_id: str):
+async def get_collection(collection_id: str, request: Request):
     """Retrieve a specific collection by its ID.
 
+    Supports conditional requests: if the client's If-None-Match header
+    matches the current ETag, an empty 304 response is returned.
+
     Args:
         collection_id (str): The ID of the collection to retrieve.
 
     Returns:
-        Collection: The collection object if found.
+        Collection: The collection object if found. The serialized body is
+        cached until the next collection write.
 
     Raises:
         HTTPException: If the collection is not found.
     """
-    collection = storage.get_collection(collection_id)
-    if not collection:
+    if not storage.get_collection(collection_id):
         raise HTTPException(status_code=404, detail="Collection not found")
-    return collection
+    cached = _collection_body(collection_id, storage.collections_version)
+    return _cached_json_response(request, cached)
 
 
 @app.post("/collections", response_model=Collection, status_code=201)
-def create_collection(collection_data: CollectionCreate):
+async def create_collection(collection_data: CollectionCreate):
     """Create a new collection.
 
     Args:
@@ -284,12 +418,12 @@ def create_collection(collection_data: CollectionCreate):
         Collection: The created collection object.
     """
     collection = Collection(**collection_data.model_dump())
-    return storage.create_collection(collection)
+    return _model_response(storage.create_collection(collection), status_code=201)
 
 
 @app.delete("/collections/{collection_id}", status_code=204)
-def delete_collection(collection_id: str):
-    """Delete a collection by its ID.
+async def delete_collection(collection_id: str):
+    """Delete a collection by its ID, along with all prompts in it.
 
     Args:
         collection_id (str): The ID of the collection to delete.
@@ -297,9 +431,7 @@ def delete_collection(collection_id: str):
     Raises:
         HTTPException: If the collection is not found.
     """
-    for prompt in storage.get_prompts_by_collection(collection_id):
-        storage.delete_prompt(prompt.id)
-    if not storage.delete_collection(collection_id):
+    if not storage.delete_collection_cascade(collection_id):
         raise HTTPException(status_code=404, detail="Collection not found")
 
 
@@ -307,23 +439,23 @@ def delete_collection(collection_id: str):
 
 
 @app.get("/tags", response_model=TagList)
-def list_tags():
+async def list_tags():
     """List all tags."""
     tags = storage.get_all_tags()
-    return TagList(tags=tags, total=len(tags))
+    return _model_response(TagList.model_construct(tags=tags, total=len(tags)))
 
 
 @app.get("/tags/{tag_id}", response_model=Tag)
-def get_tag(tag_id: str):
+async def get_tag(tag_id: str):
     """Get a tag by ID."""
     tag = storage.get_tag(tag_id)
     if not tag:
         raise HTTPException(status_code=404, detail="Tag not found")
-    return tag
+    return _model_response(tag)
 
 
 @app.post("/tags", response_model=Tag, status_code=201)
-def create_tag(tag_data: TagCreate):
+async def create_tag(tag_data: TagCreate):
     """Create a new tag. Slug is derived from name if not provided."""
     if storage.get_tag_by_name(tag_data.name):
         raise HTTPException(status_code=400, detail="Tag with this name already exists")
@@ -336,11 +468,11 @@ def create_tag(tag_data: TagCreate):
         color=tag_data.color or "",
         created_at=get_current_time(),
     )
-    return storage.create_tag(tag)
+    return _model_response(storage.create_tag(tag), status_code=201)
 
 
 @app.patch("/tags/{tag_id}", response_model=Tag)
-def patch_tag(tag_id: str, tag_data: TagPatch):
+async def patch_tag(tag_id: str, tag_data: TagPatch):
     """Partially update a tag."""
     existing = storage.get_tag(tag_id)
     if not existing:
@@ -354,11 +486,11 @@ def patch_tag(tag_id: str, tag_data: TagPatch):
             )
     for key, value in updates.items():
         setattr(existing, key, value)
-    return storage.update_tag(tag_id, existing)
+    return _model_response(storage.update_tag(tag_id, existing))
 
 
 @app.delete("/tags/{tag_id}", status_code=204)
-def delete_tag(tag_id: str):
+async def delete_tag(tag_id: str):
     """Delete a tag. Removes this tag from all prompts (cascade)."""
     if not storage.delete_tag(tag_id):
         raise HTTPException(status_code=404, detail="Tag not found")
@@ -368,15 +500,15 @@ def delete_tag(tag_id: str):
 
 
 @app.get("/prompts/{prompt_id}/tags", response_model=TagList)
-def get_prompt_tags(prompt_id: str):
+async def get_prompt_tags(prompt_id: str):
     """List tags assigned to a prompt."""
     _get_prompt_or_404(prompt_id)
     tags = storage.get_tags_for_prompt(prompt_id)
-    return TagList(tags=tags, total=len(tags))
+    return _model_response(TagList.model_construct(tags=tags, total=len(tags)))
 
 
 @app.put("/prompts/{prompt_id}/tags")
-def set_prompt_tags(prompt_id: str, body: AssignTagsRequest):
+async def set_prompt_tags(prompt_id: str, body: AssignTagsRequest):
     """Set the tags on a prompt. Replaces existing tags."""
     _get_prompt_or_404(prompt_id)
     _validate_tag_ids(body.tag_ids)
@@ -385,7 +517,7 @@ def set_prompt_tags(prompt_id: str, body: AssignTagsRequest):
 
 
 @app.post("/prompts/{prompt_id}/tags")
-def add_prompt_tag(prompt_id: str, body: AssignTagsRequest):
+async def add_prompt_tag(prompt_id: str, body: AssignTagsRequest):
     """Add one or more tags to a prompt."""
     _get_prompt_or_404(prompt_id)
     _validate_tag_ids(body.tag_ids)
@@ -396,7 +528,7 @@ def add_prompt_tag(prompt_id: str, body: AssignTagsRequest):
 
 
 @app.delete("/prompts/{prompt_id}/tags/{tag_id}", status_code=204)
-def remove_prompt_tag(prompt_id: str, tag_id: str):
+async def remove_prompt_tag(prompt_id: str, tag_id: str):
     """Remove a tag from a prompt."""
     _get_prompt_or_404(prompt_id)
     storage.remove_prompt_tag(prompt_id, tag_id)
@@ -0,0 +1,60 @@
+"""ASGI middleware for PromptLab"""
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.utils import etag_matches, make_etag
+
+
+class ETagMiddleware:
+    """Add ETags to successful GET responses and answer conditional requests.
+
+    The response body is hashed to produce a weak ETag. When the request's
+    If-None-Match header matches, the body is dropped and an empty
+    ``304 Not Modified`` is sent instead. Responses that already carry an
+    ETag (set by the route itself) are passed through untouched.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        start: Message | None = None
+        buffering = False
+        body = bytearray()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start, buffering
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if 200 <= message["status"] < 300 and "etag" not in headers:
+                    start, buffering = message, True
+                    return
+                await send(message)
+                return
+            if not buffering or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body.extend(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            etag = make_etag(bytes(body))
+            headers = MutableHeaders(raw=list(start["headers"]))
+            headers["ETag"] = etag
+            if etag_matches(if_none_match, etag):
+                del headers["content-length"]
+                del headers["content-type"]
+                await send({**start, "status": 304, "headers": headers.raw})
+                await send({"type": "http.response.body", "body": b""})
+                return
+            await send({**start, "headers": headers.raw})
+            await send({"type": "http.response.body", "body": bytes(body)})
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,14 +1,24 @@
 """Pydantic models for PromptLab"""
 
+import time
 from datetime import UTC, datetime
-from uuid import uuid4
+from itertools import count
 
 from pydantic import BaseModel, ConfigDict, Field
 
+# Process-unique id prefix (start time in ns, fixed width) and sequence counter
+_ID_PREFIX = f"{time.time_ns():016x}"
+_ID_COUNTER = count(1)
+
 
 def generate_id() -> str:
-    """Generates a unique identifier."""
-    return str(uuid4())
+    """Generates a unique identifier.
+
+    IDs are a fixed-width process-start timestamp followed by a per-process
+    sequence number. They are cheap to produce but predictable, so they must
+    not be used as secrets.
+    """
+    return f"{_ID_PREFIX}{next(_ID_COUNTER):x}"
 
 
 def get_current_time() -> datetime:
@@ -168,7 +178,7 @@ class Tag(BaseModel):
     """First-class entity for a tag.
 
     Attributes:
-        id (str): Unique tag id (UUID).
+        id (str): Unique tag id.
         name (str): Display name; 1-50 characters; unique across tags.
         slug (Optional[str]): URL-friendly unique identifier.
         description (Optional[str]): Short description; max 200 characters.
@@ -176,7 +186,7 @@ class Tag(BaseModel):
         created_at (Optional[datetime]): When the tag was created.
     """
 
-    id: str = Field(default_factory=generate_id, description="Unique tag id (UUID).")
+    id: str = Field(default_factory=generate_id, description="Unique tag id.")
     name: str = Field(
         ...,
         min_length=1,
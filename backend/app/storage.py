@@ -4,28 +4,159 @@ This module provides simple in-memory storage for prompts and collections.
 In a production environment, this would be replaced with a database.
 """
 
+from collections import defaultdict
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+
+from sortedcontainers import SortedList
+
 from app.models import Collection, Prompt, Tag
+from app.utils import filter_prompts_by_tags
+
+
+@dataclass(slots=True)
+class _PromptRow:
+    """Compact internal representation of a stored prompt.
+
+    Rows use ``__slots__`` instead of a Pydantic model's per-instance
+    ``__dict__`` and field-tracking state. A ``Prompt`` is only built when a
+    prompt leaves the storage layer.
+    """
+
+    id: str
+    title: str
+    content: str
+    description: str | None
+    collection_id: str | None
+    tag_ids: list[str]
+    created_at: datetime
+    updated_at: datetime
+    created_us: int
+    # Insertion sequence; breaks created_at ties in insertion order
+    seq: int
+    # Storage-wide prompts_version at the row's last change; never reused
+    rev: int = 0
+
+    @classmethod
+    def from_prompt(cls, prompt: Prompt, seq: int) -> "_PromptRow":
+        """Builds a row from a validated Prompt."""
+        return cls(
+            id=prompt.id,
+            title=prompt.title,
+            content=prompt.content,
+            description=prompt.description,
+            collection_id=prompt.collection_id,
+            tag_ids=list(prompt.tag_ids),
+            created_at=prompt.created_at,
+            updated_at=prompt.updated_at,
+            created_us=_created_us(prompt.created_at),
+            seq=seq,
+        )
+
+    def to_dict(self) -> dict[str, object]:
+        """Returns the row's fields as a plain dict, in Prompt field order."""
+        return {
+            "title": self.title,
+            "content": self.content,
+            "description": self.description,
+            "collection_id": self.collection_id,
+            "tag_ids": self.tag_ids,
+            "id": self.id,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+    def order_key(self) -> tuple[int, int, str]:
+        """Returns the row's position in newest-first order.
+
+        Prompts created at the same instant keep their insertion order, as
+        the stable sort this index replaced did.
+        """
+        return (-self.created_us, self.seq, self.id)
+
+    def to_prompt(self) -> Prompt:
+        """Builds a Prompt from the row without re-validating its fields."""
+        return Prompt.model_construct(
+            id=self.id,
+            title=self.title,
+            content=self.content,
+            description=self.description,
+            collection_id=self.collection_id,
+            tag_ids=list(self.tag_ids),
+            created_at=self.created_at,
+            updated_at=self.updated_at,
+        )
 
 
 class Storage:
+    """In-memory store for prompts, collections, and tags plus derived indexes.
+
+    Concurrency model: the API's route handlers are ``async`` and run on a
+    single event-loop thread, and no Storage method awaits. Each method call
+    therefore runs to completion before another request can touch the store,
+    which keeps the primary dicts and the secondary indexes consistent
+    without locks or sharding. Calling Storage from other threads (e.g. sync
+    ``def`` handlers, which FastAPI runs in a threadpool) would break this
+    and require a lock.
+
+    State is per process: with several Uvicorn workers each one has its own
+    independent Storage, so multi-worker deployments need a shared backend.
+    """
+
     def __init__(self):
         """Initializes the Storage with empty dictionaries for prompts, collections, and tags."""
-        self._prompts: dict[str, Prompt] = {}
+        self._prompts: dict[str, _PromptRow] = {}
         self._collections: dict[str, Collection] = {}
         self._tags: dict[str, Tag] = {}
+        # Secondary index: collection_id -> that collection's prompts, ordered
+        # like _by_created
+        self._by_collection: defaultdict[str, SortedList[tuple[int, int, str]]] = (
+            defaultdict(SortedList)
+        )
+        # Prompt ids ordered newest first, as _PromptRow.order_key() tuples
+        self._by_created: SortedList[tuple[int, int, str]] = SortedList()
+        # Search index: lowercased title/description per prompt, and
+        # trigram of that text -> prompt ids
+        self._search_text: dict[str, str] = {}
+        self._trigrams: defaultdict[str, set[str]] = defaultdict(set)
+        # Bumped on every mutation so callers can cache derived data per version
+        self._prompts_version = 0
+        self._collections_version = 0
+        self._next_seq = 0
+
+    @property
+    def prompts_version(self) -> int:
+        """Returns a counter that changes whenever any prompt changes."""
+        return self._prompts_version
+
+    @property
+    def collections_version(self) -> int:
+        """Returns a counter that changes whenever any collection changes."""
+        return self._collections_version
 
     # ============== Prompt Operations ==============
 
     def create_prompt(self, prompt: Prompt) -> Prompt:
         """Stores a new prompt in the storage.
 
+        A prompt whose ID is already stored replaces the existing one.
+
         Args:
             prompt (Prompt): The prompt to be stored.
 
         Returns:
             Prompt: The stored prompt object.
         """
-        self._prompts[prompt.id] = prompt
+        if prompt.id in self._prompts:
+            return self.update_prompt(prompt.id, prompt)
+        self._next_seq += 1
+        row = _PromptRow.from_prompt(prompt, self._next_seq)
+        self._prompts[prompt.id] = row
+        self._index_collection(None, row)
+        self._by_created.add(row.order_key())
+        self._index_search(prompt.id, row)
+        self._touch(row)
         return prompt
 
     def get_prompt(self, prompt_id: str) -> Prompt | None:
@@ -37,7 +168,23 @@ class Storage:
         Returns:
             Optional[Prompt]: The prompt object if found, otherwise None.
         """
-        return self._prompts.get(prompt_id)
+        row = self._prompts.get(prompt_id)
+        return row.to_prompt() if row else None
+
+    def get_prompt_revision(self, prompt_id: str) -> int | None:
+        """Retrieves a prompt's revision without building the Prompt model.
+
+        The revision changes on every change to the prompt (including tag
+        assignment) and is never reused, even across prompts.
+
+        Args:
+            prompt_id (str): The ID of the prompt.
+
+        Returns:
+            Optional[int]: The prompt's revision if found, otherwise None.
+        """
+        row = self._prompts.get(prompt_id)
+        return row.rev if row else None
 
     def get_all_prompts(self) -> list[Prompt]:
         """Retrieves all stored prompts.
@@ -45,7 +192,53 @@ class Storage:
         Returns:
             List[Prompt]: A list of all prompt objects.
         """
-        return list(self._prompts.values())
+        return [row.to_prompt() for row in self._prompts.values()]
+
+    def get_prompt_records(
+        self,
+        collection_id: str | None = None,
+        search: str | None = None,
+        tag_ids: Sequence[str] = (),
+        match_all: bool = True,
+    ) -> list[dict[str, object]]:
+        """Lists prompts newest first as plain dicts of their fields.
+
+        Prompts with equal 'created_at' keep insertion order. Filters are
+        applied to the stored rows, so no Prompt model is built; the records
+        are meant to be serialized directly.
+
+        Args:
+            collection_id (str | None): Only prompts in this collection.
+            search (str | None): Only prompts matching this query, as in search_prompt_ids().
+            tag_ids (Sequence[str]): Only prompts with all (or any) of these tags.
+            match_all (bool): Require all tag_ids if True (default), any otherwise.
+
+        Returns:
+            List[dict]: The matching prompts' fields, ordered by 'created_at'.
+        """
+        rows = self._select_rows(collection_id, search)
+        if tag_ids:
+            rows = filter_prompts_by_tags(rows, list(tag_ids), match_all=match_all)
+        return [row.to_dict() for row in rows]
+
+    def _select_rows(
+        self, collection_id: str | None, search: str | None = None
+    ) -> list[_PromptRow]:
+        """Returns the rows in a collection (or all rows) matching a search, newest first."""
+        if search:
+            # Usually far fewer matches than rows: order just the matches
+            rows = sorted(
+                (self._prompts[pid] for pid in self.search_prompt_ids(search)),
+                key=_PromptRow.order_key,
+            )
+            if collection_id:
+                rows = [row for row in rows if row.collection_id == collection_id]
+            return rows
+        if collection_id:
+            entries = self._by_collection.get(collection_id, ())
+        else:
+            entries = self._by_created
+        return [self._prompts[pid] for _, _, pid in entries]
 
     def update_prompt(self, prompt_id: str, prompt: Prompt) -> Prompt | None:
         """Updates an existing prompt.
@@ -57,9 +250,17 @@ class Storage:
         Returns:
             Optional[Prompt]: The updated prompt if successful, otherwise None.
         """
-        if prompt_id not in self._prompts:
+        existing = self._prompts.get(prompt_id)
+        if existing is None:
             return None
-        self._prompts[prompt_id] = prompt
+        row = _PromptRow.from_prompt(prompt, existing.seq)
+        self._prompts[prompt_id] = row
+        self._index_collection(existing, row)
+        if row.created_us != existing.created_us:
+            self._by_created.remove(existing.order_key())
+            self._by_created.add(row.order_key())
+        self._index_search(prompt_id, row)
+        self._touch(row)
         return prompt
 
     def delete_prompt(self, prompt_id: str) -> bool:
@@ -71,10 +272,82 @@ class Storage:
         Returns:
             bool: True if the prompt was deleted, otherwise False.
         """
-        if prompt_id in self._prompts:
-            del self._prompts[prompt_id]
-            return True
-        return False
+        row = self._prompts.pop(prompt_id, None)
+        if row is None:
+            return False
+        self._index_collection(row, None)
+        self._by_created.remove(row.order_key())
+        self._index_search(prompt_id, None)
+        self._prompts_version += 1
+        return True
+
+    def _touch(self, row: _PromptRow) -> None:
+        """Records a change to a prompt: bumps the version and stamps the row."""
+        self._prompts_version += 1
+        row.rev = self._prompts_version
+
+    def _index_collection(self, old: _PromptRow | None, new: _PromptRow | None) -> None:
+        """Moves a prompt between collection index buckets, or re-keys it."""
+        old_id = old.collection_id if old else None
+        new_id = new.collection_id if new else None
+        old_key = old.order_key() if old else None
+        new_key = new.order_key() if new else None
+        if old_id == new_id and old_key == new_key:
+            return
+        if old_id:
+            bucket = self._by_collection.get(old_id)
+            if bucket is not None:
+                bucket.discard(old_key)
+                if not bucket:
+                    del self._by_collection[old_id]
+        if new_id:
+            self._by_collection[new_id].add(new_key)
+
+    def _index_search(self, prompt_id: str, row: _PromptRow | None) -> None:
+        """Refreshes a prompt's cached search text and its trigram index entries."""
+        old_text = self._search_text.pop(prompt_id, "")
+        new_text = _search_text(row) if row else ""
+        if row:
+            self._search_text[prompt_id] = new_text
+        if new_text == old_text:
+            return
+        old_grams, new_grams = _trigrams(old_text), _trigrams(new_text)
+        for gram in old_grams - new_grams:
+            bucket = self._trigrams[gram]
+            bucket.discard(prompt_id)
+            if not bucket:
+                del self._trigrams[gram]
+        for gram in new_grams - old_grams:
+            self._trigrams[gram].add(prompt_id)
+
+    def search_prompt_ids(self, query: str) -> set[str]:
+        """Finds prompts whose title or description contains a query string.
+
+        Matching is case insensitive. Candidates are narrowed with the trigram
+        index and then checked against the precomputed lowercase search text,
+        so no prompt text is lowercased per query.
+
+        Args:
+            query (str): The query string to search for.
+
+        Returns:
+            Set[str]: IDs of the matching prompts.
+        """
+        query_lower = query.lower()
+        if "\x00" in query_lower:
+            # NUL only appears as the field separator in the search text
+            return set()
+        grams = _trigrams(query_lower)
+        if not grams:
+            return {
+                pid for pid, text in self._search_text.items() if query_lower in text
+            }
+        postings = sorted((self._trigrams.get(g, set()) for g in grams), key=len)
+        return {
+            pid
+            for pid in set.intersection(*postings)
+            if query_lower in self._search_text[pid]
+        }
 
     # ============== Collection Operations ==============
 
@@ -88,6 +361,7 @@ class Storage:
             Collection: The stored collection object.
         """
         self._collections[collection.id] = collection
+        self._collections_version += 1
         return collection
 
     def get_collection(self, collection_id: str) -> Collection | None:
@@ -109,8 +383,11 @@ class Storage:
         """
         return list(self._collections.values())
 
-    def delete_collection(self, collection_id: str) -> bool:
-        """Deletes a collection by ID.
+    def delete_collection_cascade(self, collection_id: str) -> bool:
+        """Deletes a collection and every prompt that belongs to it.
+
+        The collection's prompts are taken from the collection index in one
+        pass, without scanning other prompts.
 
         Args:
             collection_id (str): The ID of the collection to delete.
@@ -118,21 +395,32 @@ class Storage:
         Returns:
             bool: True if the collection was deleted, otherwise False.
         """
-        if collection_id in self._collections:
-            del self._collections[collection_id]
-            return True
-        return False
+        if collection_id not in self._collections:
+            return False
+        entries = self._by_collection.pop(collection_id, ())
+        for entry in entries:
+            prompt_id = entry[2]
+            del self._prompts[prompt_id]
+            self._by_created.remove(entry)
+            self._index_search(prompt_id, None)
+        if entries:
+            self._prompts_version += 1
+        del self._collections[collection_id]
+        self._collections_version += 1
+        return True
 
     def get_prompts_by_collection(self, collection_id: str) -> list[Prompt]:
         """Retrieves all prompts that belong to a specified collection.
 
+        Prompts come newest first, in the same order as get_prompt_records().
+
         Args:
             collection_id (str): The ID of the collection whose prompts are to be retrieved.
 
         Returns:
             List[Prompt]: A list of prompts that belong to the specified collection.
         """
-        return [p for p in self._prompts.values() if p.collection_id == collection_id]
+        return [row.to_prompt() for row in self._select_rows(collection_id)]
 
     # ============== Tag Operations ==============
 
@@ -168,69 +456,102 @@ class Storage:
         """Removes tag and removes tag_id from every prompt's tag_ids."""
         if tag_id not in self._tags:
             return False
-        for prompt in self._prompts.values():
-            if tag_id in prompt.tag_ids:
-                new_ids = [tid for tid in prompt.tag_ids if tid != tag_id]
-                updated = _prompt_with(prompt, tag_ids=new_ids)
-                self._prompts[prompt.id] = updated
+        for row in self._prompts.values():
+            if tag_id in row.tag_ids:
+                row.tag_ids = [tid for tid in row.tag_ids if tid != tag_id]
+                self._touch(row)
         del self._tags[tag_id]
         return True
 
     def get_tags_for_prompt(self, prompt_id: str) -> list[Tag]:
         """Resolves prompt's tag_ids to Tag objects."""
-        prompt = self._prompts.get(prompt_id)
-        if not prompt or not prompt.tag_ids:
+        row = self._prompts.get(prompt_id)
+        if not row or not row.tag_ids:
             return []
-        return [self._tags[tid] for tid in prompt.tag_ids if tid in self._tags]
+        return [self._tags[tid] for tid in row.tag_ids if tid in self._tags]
 
     def set_prompt_tags(self, prompt_id: str, tag_ids: list[str]) -> None:
         """Sets prompt's tag_ids. Caller must validate tag_ids exist."""
-        prompt = self._prompts.get(prompt_id)
-        if not prompt:
+        row = self._prompts.get(prompt_id)
+        if not row:
             return
-        updated = _prompt_with(prompt, tag_ids=list(tag_ids))
-        self._prompts[prompt_id] = updated
+        row.tag_ids = list(tag_ids)
+        self._touch(row)
 
     def add_prompt_tag(self, prompt_id: str, tag_id: str) -> bool:
         """Adds one tag to prompt. Returns False if prompt or tag not found."""
         if prompt_id not in self._prompts or tag_id not in self._tags:
             return False
-        prompt = self._prompts[prompt_id]
-        if tag_id in prompt.tag_ids:
+        row = self._prompts[prompt_id]
+        if tag_id in row.tag_ids:
             return True
-        new_ids = list(prompt.tag_ids) + [tag_id]
+        new_ids = row.tag_ids + [tag_id]
         self.set_prompt_tags(prompt_id, new_ids)
         return True
 
     def remove_prompt_tag(self, prompt_id: str, tag_id: str) -> bool:
         """Removes one tag from prompt. Returns True if removed or already absent."""
-        prompt = self._prompts.get(prompt_id)
-        if not prompt:
+        row = self._prompts.get(prompt_id)
+        if not row:
             return False
-        if tag_id not in prompt.tag_ids:
+        if tag_id not in row.tag_ids:
             return True
-        new_ids = [tid for tid in prompt.tag_ids if tid != tag_id]
+        new_ids = [tid for tid in row.tag_ids if tid != tag_id]
         self.set_prompt_tags(prompt_id, new_ids)
         return True
 
     def get_prompts_by_tag(self, tag_id: str) -> list[Prompt]:
         """Returns all prompts that have this tag_id in their tag_ids."""
-        return [p for p in self._prompts.values() if tag_id in p.tag_ids]
+        return [
+            row.to_prompt() for row in self._prompts.values() if tag_id in row.tag_ids
+        ]
 
     # ============== Utility ==============
 
     def clear(self) -> None:
-        """Clears all stored prompts, collections, and tags."""
+        """Clears all stored prompts, collections, and tags.
+
+        Versions are bumped rather than reset so caches keyed on them never
+        see a previously used version.
+        """
         self._prompts.clear()
         self._collections.clear()
         self._tags.clear()
+        self._by_collection.clear()
+        self._by_created.clear()
+        self._search_text.clear()
+        self._trigrams.clear()
+        self._prompts_version += 1
+        self._collections_version += 1
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _created_us(created_at: datetime) -> int:
+    """Returns a creation time as integer microseconds since the epoch.
+
+    Integer keys keep the sorted index's comparisons cheap and, unlike a float
+    timestamp, exact. Naive datetimes are taken to be UTC.
+    """
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=UTC)
+    return (created_at - _EPOCH) // _MICROSECOND
+
+
+def _trigrams(text: str) -> set[str]:
+    """Returns the set of 3-character substrings of text."""
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
 
+def _search_text(row: _PromptRow) -> str:
+    """Returns a prompt's searchable fields, lowercased and NUL-separated.
 
-def _prompt_with(prompt: Prompt, **overrides: object) -> Prompt:
-    """Return a new Prompt with the same fields as prompt and optional overrides."""
-    data = prompt.model_dump()
-    data.update(overrides)
-    return Prompt(**data)
+    The separator keeps a query from matching across the title/description
+    boundary.
+    """
+    return f"{row.title}\x00{row.description or ''}".lower()
 
 
 # Global storage instance
@@ -1,44 +1,45 @@
 """Utility functions for PromptLab"""
 
 import re
+from hashlib import blake2b
 
 from app.models import Prompt
 
+# Template variables in prompt content, e.g. {{variable_name}}
+_TEMPLATE_VARIABLE_RE = re.compile(r"\{\{(\w+)\}\}")
+
 
 def slug_from_name(name: str) -> str:
     """Derive a URL-friendly slug from a name (e.g. for tags)."""
     return name.strip().lower().replace(" ", "-")
 
 
-def sort_prompts_by_date(
-    prompts: list[Prompt], descending: bool = True
-) -> list[Prompt]:
-    """Sort prompts by their creation date.
-
-    Args:
-        prompts (List[Prompt]): A list of Prompt objects to sort.
-        descending (bool): Determines if the sort should be in descending order. Defaults to True.
+def make_etag(data: bytes) -> str:
+    """Build a weak HTTP entity tag from raw bytes (e.g. a response body)."""
+    return f'W/"{blake2b(data, digest_size=8).hexdigest()}"'
 
-    Returns:
-        List[Prompt]: A list of prompts sorted by the 'created_at' attribute.
-    """
-    # Sort based on 'created_at' attribute
-    return sorted(prompts, key=lambda prompt: prompt.created_at, reverse=descending)
 
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Check an If-None-Match header value against an entity tag.
 
-def filter_prompts_by_collection(
-    prompts: list[Prompt], collection_id: str
-) -> list[Prompt]:
-    """Filter prompts by a specific collection ID.
+    Uses the weak comparison required for If-None-Match, so ``W/`` prefixes
+    are ignored on both sides.
 
     Args:
-        prompts (List[Prompt]): A list of Prompt objects to filter.
-        collection_id (str): The collection ID to filter by.
+        if_none_match: Raw If-None-Match header value, if any.
+        etag: The current entity tag of the resource.
 
     Returns:
-        List[Prompt]: A list of prompts that belong to the specified collection.
+        bool: True if the client's cached representation is still current.
     """
-    return [p for p in prompts if p.collection_id == collection_id]
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    current = etag.removeprefix("W/")
+    return any(
+        tag.strip().removeprefix("W/") == current for tag in if_none_match.split(",")
+    )
 
 
 def filter_prompts_by_tags(
@@ -67,24 +68,6 @@ def filter_prompts_by_tags(
     ]
 
 
-def search_prompts(prompts: list[Prompt], query: str) -> list[Prompt]:
-    """Search prompts by a query string.
-
-    Args:
-        prompts (List[Prompt]): A list of Prompt objects to search within.
-        query (str): The query string to search for in prompt titles and descriptions.
-    Returns:
-        List[Prompt]: A list of prompts where the query string is found in the title or description.
-    """
-    query_lower = query.lower()
-    return [
-        p
-        for p in prompts
-        if query_lower in p.title.lower()
-        or (p.description and query_lower in p.description.lower())
-    ]
-
-
 # The following helpers are for future use (e.g. prompt validation or docs).
 def validate_prompt_content(content: str) -> bool:
     """Check if prompt content is valid.
@@ -104,5 +87,4 @@ def extract_variables(content: str) -> list[str]:
 
     Variables are in the format {{variable_name}}
     """
-    pattern = r"\{\{(\w+)\}\}"
-    return re.findall(pattern, content)
+    return _TEMPLATE_VARIABLE_RE.findall(content)
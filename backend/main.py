@@ -2,12 +2,23 @@
 
 Run with: python main.py
 For dev with auto-reload: RELOAD=1 python main.py
+For multiple worker processes: WORKERS=4 python main.py (see README: each
+worker has its own in-memory storage)
 """
 
 import os
 import uvicorn
-from app.api import app
 
 if __name__ == "__main__":
     use_reload = os.environ.get("RELOAD", "").lower() == "1"
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=use_reload)
+    # Storage is in-process memory, so extra workers do not share data; keep
+    # the default at one until storage moves to a shared backend.
+    workers = int(os.environ.get("WORKERS", "1"))
+    # uvicorn picks uvloop and httptools automatically when they are installed
+    uvicorn.run(
+        "app.api:app",
+        host="0.0.0.0",
+        port=8000,
+        reload=use_reload,
+        workers=workers,
+    )
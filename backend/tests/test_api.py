@@ -4,9 +4,16 @@ These tests verify the API endpoints work correctly.
 Students should expand these tests significantly in Week 3.
 """
 
+import gzip
+from datetime import UTC, datetime, timedelta, timezone
+
 import pytest
 from fastapi.testclient import TestClient
 
+from app.api import _prompt_list_body
+from app.models import Prompt
+from app.storage import storage
+
 
 class TestHealth:
     """Tests for health endpoint."""
@@ -129,6 +136,75 @@ class TestPrompts:
         # Newest (Second) should be first
         assert prompts[0]["title"] == "Second"  # Will fail until Bug #3 fixed
 
+    def test_sorting_order_after_delete_and_collection_filter(
+        self, client: TestClient, sample_collection_data
+    ):
+        col_response = client.post("/collections", json=sample_collection_data)
+        collection_id = col_response.json()["id"]
+        ids = [
+            client.post(
+                "/prompts",
+                json={
+                    "title": f"P{i}",
+                    "content": "Prompt content",
+                    "collection_id": collection_id,
+                },
+            ).json()["id"]
+            for i in range(3)
+        ]
+        client.delete(f"/prompts/{ids[1]}")
+        expected = [ids[2], ids[0]]
+        listed = client.get("/prompts").json()["prompts"]
+        assert [p["id"] for p in listed] == expected
+        filtered = client.get("/prompts", params={"collection_id": collection_id})
+        assert [p["id"] for p in filtered.json()["prompts"]] == expected
+
+    def test_sorting_order_equal_created_at_keeps_insertion_order(
+        self, client: TestClient, sample_collection_data
+    ):
+        col_response = client.post("/collections", json=sample_collection_data)
+        collection_id = col_response.json()["id"]
+        created_at = datetime(2024, 1, 1, tzinfo=UTC)
+        ids = [
+            storage.create_prompt(
+                Prompt(
+                    title=f"P{i}",
+                    content="Prompt content",
+                    collection_id=collection_id,
+                    created_at=created_at,
+                )
+            ).id
+            for i in range(20)
+        ]
+        listed = client.get("/prompts").json()["prompts"]
+        assert [p["id"] for p in listed] == ids
+        filtered = client.get("/prompts", params={"collection_id": collection_id})
+        assert [p["id"] for p in filtered.json()["prompts"]] == ids
+
+    def test_sorting_order_with_naive_created_at(self, client: TestClient):
+        storage.create_prompt(
+            Prompt(
+                title="Old", content="Prompt content", created_at=datetime(2024, 1, 1)
+            )
+        )
+        storage.create_prompt(
+            Prompt(
+                title="New",
+                content="Prompt content",
+                created_at=datetime(2024, 1, 1, 1, tzinfo=UTC),
+            )
+        )
+        listed = client.get("/prompts").json()["prompts"]
+        assert [p["title"] for p in listed] == ["New", "Old"]
+
+    def test_storing_existing_prompt_id_replaces_it(self, client: TestClient):
+        prompt = storage.create_prompt(Prompt(title="Old", content="Prompt content"))
+        storage.create_prompt(prompt.model_copy(update={"title": "New"}))
+        listed = client.get("/prompts").json()["prompts"]
+        assert [p["title"] for p in listed] == ["New"]
+        storage.delete_prompt(prompt.id)
+        assert client.get("/prompts").json()["prompts"] == []
+
     def test_create_prompt_invalid_collection_id_returns_400(
         self, client: TestClient, sample_prompt_data
     ):
@@ -225,6 +301,21 @@ class TestPrompts:
         assert response.json()["total"] == 1
         assert response.json()["prompts"][0]["collection_id"] == c1
 
+    def test_list_prompts_filter_by_collection_after_move(
+        self, client: TestClient, sample_prompt_data, sample_collection_data
+    ):
+        c1 = client.post("/collections", json=sample_collection_data).json()["id"]
+        c2 = client.post("/collections", json={"name": "Other"}).json()["id"]
+        prompt_id = client.post(
+            "/prompts", json={**sample_prompt_data, "collection_id": c1}
+        ).json()["id"]
+        client.patch(f"/prompts/{prompt_id}", json={"collection_id": c2})
+        assert client.get("/prompts", params={"collection_id": c1}).json()["total"] == 0
+        moved = client.get("/prompts", params={"collection_id": c2}).json()
+        assert [p["id"] for p in moved["prompts"]] == [prompt_id]
+        client.delete(f"/prompts/{prompt_id}")
+        assert client.get("/prompts", params={"collection_id": c2}).json()["total"] == 0
+
     def test_list_prompts_search_query(self, client: TestClient, sample_prompt_data):
         client.post(
             "/prompts",
@@ -247,6 +338,39 @@ class TestPrompts:
         assert response.json()["total"] == 1
         assert "Python" in response.json()["prompts"][0]["title"]
 
+    def test_list_prompts_search_partial_and_short_queries(
+        self, client: TestClient, sample_prompt_data
+    ):
+        client.post(
+            "/prompts",
+            json={**sample_prompt_data, "title": "Python tutorial"},
+        )
+        client.post(
+            "/prompts",
+            json={**sample_prompt_data, "title": "Guide", "description": "Learn JS"},
+        )
+        for query, expected in [("YTHO", 1), ("js", 1), ("learn", 1), ("n", 2)]:
+            response = client.get("/prompts", params={"search": query})
+            assert response.json()["total"] == expected, query
+        assert client.get("/prompts", params={"search": "ial gui"}).json()["total"] == 0
+        response = client.get("/prompts", params={"search": "guidelearn"})
+        assert response.json()["total"] == 0
+        response = client.get("/prompts", params={"search": "e\x00learn"})
+        assert response.json()["total"] == 0
+        assert client.get("/prompts", params={"search": "\x00"}).json()["total"] == 0
+
+    def test_list_prompts_search_reflects_updates(
+        self, client: TestClient, sample_prompt_data
+    ):
+        prompt_id = client.post("/prompts", json=sample_prompt_data).json()["id"]
+        client.patch(f"/prompts/{prompt_id}", json={"title": "Renamed prompt"})
+        assert client.get("/prompts", params={"search": "review"}).json()["total"] == 1
+        response = client.get("/prompts", params={"search": "review p"})
+        assert response.json()["total"] == 0
+        assert client.get("/prompts", params={"search": "renamed"}).json()["total"] == 1
+        client.delete(f"/prompts/{prompt_id}")
+        assert client.get("/prompts", params={"search": "renamed"}).json()["total"] == 0
+
     def test_list_prompts_tag_ids_empty_or_no_match(
         self, client: TestClient, sample_prompt_data
     ):
@@ -326,6 +450,24 @@ class TestPrompts:
         assert data["title"] == "Patched Title Only"
         assert data["content"] == original_content
 
+    def test_patch_prompt_ignores_null_and_empty_values(
+        self, client: TestClient, sample_prompt_data
+    ):
+        tag_id = client.post("/tags", json={"name": "patch"}).json()["id"]
+        create = client.post(
+            "/prompts", json={**sample_prompt_data, "tag_ids": [tag_id]}
+        ).json()
+        response = client.patch(
+            f"/prompts/{create['id']}",
+            json={"description": "", "collection_id": None, "tag_ids": []},
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["description"] == sample_prompt_data["description"]
+        assert data["collection_id"] is None
+        assert data["tag_ids"] == []
+        assert data["created_at"] == create["created_at"]
+
     def test_patch_prompt_not_found_returns_404(
         self, client: TestClient, sample_prompt_data
     ):
@@ -455,6 +597,32 @@ class TestCollections:
             assert prompts[0]["collection_id"] == collection_id
             # After fix, collection_id should be None or prompt should be deleted
 
+    def test_delete_collection_cascades_to_its_prompts_only(
+        self, client: TestClient, sample_collection_data, sample_prompt_data
+    ):
+        col_response = client.post("/collections", json=sample_collection_data)
+        collection_id = col_response.json()["id"]
+        for title in ("In collection", "Also in collection"):
+            client.post(
+                "/prompts",
+                json={
+                    **sample_prompt_data,
+                    "title": title,
+                    "collection_id": collection_id,
+                },
+            )
+        other_id = client.post("/prompts", json=sample_prompt_data).json()["id"]
+
+        response = client.delete(f"/collections/{collection_id}")
+        assert response.status_code == 204
+        prompts = client.get("/prompts").json()["prompts"]
+        assert [p["id"] for p in prompts] == [other_id]
+        assert client.get("/prompts", params={"search": "collection"}).json() == {
+            "prompts": [],
+            "total": 0,
+        }
+        assert client.get(f"/collections/{collection_id}").status_code == 404
+
 
 class TestTags:
     """Tests for tag CRUD endpoints."""
@@ -734,3 +902,241 @@ class TestPromptTags:
         )
         assert response.status_code == 400
         assert "not found" in response.json().get("detail", "").lower()
+
+
+class TestConditionalRequests:
+    """Tests for ETag / If-None-Match handling on GET endpoints."""
+
+    def test_list_prompts_sets_etag(self, client: TestClient, sample_prompt_data):
+        client.post("/prompts", json=sample_prompt_data)
+        response = client.get("/prompts")
+        assert response.status_code == 200
+        assert response.headers["etag"].startswith('W/"')
+
+    def test_list_prompts_not_modified(self, client: TestClient, sample_prompt_data):
+        client.post("/prompts", json=sample_prompt_data)
+        etag = client.get("/prompts").headers["etag"]
+        response = client.get("/prompts", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+    def test_list_prompts_etag_changes_after_write(
+        self, client: TestClient, sample_prompt_data
+    ):
+        etag = client.get("/prompts").headers["etag"]
+        client.post("/prompts", json=sample_prompt_data)
+        response = client.get("/prompts", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert response.json()["total"] == 1
+
+    def test_get_prompt_not_modified(self, client: TestClient, sample_prompt_data):
+        prompt_id = client.post("/prompts", json=sample_prompt_data).json()["id"]
+        etag = client.get(f"/prompts/{prompt_id}").headers["etag"]
+        response = client.get(f"/prompts/{prompt_id}", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+
+    def test_get_prompt_etag_changes_after_tag_assignment(
+        self, client: TestClient, sample_prompt_data
+    ):
+        prompt_id = client.post("/prompts", json=sample_prompt_data).json()["id"]
+        etag = client.get(f"/prompts/{prompt_id}").headers["etag"]
+        tag_id = client.post("/tags", json={"name": "etag"}).json()["id"]
+        client.put(f"/prompts/{prompt_id}/tags", json={"tag_ids": [tag_id]})
+        response = client.get(f"/prompts/{prompt_id}", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()["tag_ids"] == [tag_id]
+
+    def test_get_collection_not_modified(
+        self, client: TestClient, sample_collection_data
+    ):
+        col_response = client.post("/collections", json=sample_collection_data)
+        collection_id = col_response.json()["id"]
+        etag = client.get(f"/collections/{collection_id}").headers["etag"]
+        response = client.get(
+            f"/collections/{collection_id}", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 304
+
+    def test_list_tags_not_modified(self, client: TestClient):
+        client.post("/tags", json={"name": "conditional"})
+        etag = client.get("/tags").headers["etag"]
+        response = client.get("/tags", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+
+    def test_not_found_has_no_etag(self, client: TestClient):
+        response = client.get("/prompts/nonexistent-id")
+        assert response.status_code == 404
+        assert "etag" not in response.headers
+
+
+class TestResponseCaching:
+    """Tests that cached list responses are invalidated by writes."""
+
+    def test_list_collections_reflects_writes(
+        self, client: TestClient, sample_collection_data
+    ):
+        assert client.get("/collections").json()["total"] == 0
+        col_response = client.post("/collections", json=sample_collection_data)
+        assert client.get("/collections").json()["total"] == 1
+        client.delete(f"/collections/{col_response.json()['id']}")
+        assert client.get("/collections").json()["total"] == 0
+
+    def test_list_prompts_reflects_tag_changes(
+        self, client: TestClient, sample_prompt_data
+    ):
+        tag_id = client.post("/tags", json={"name": "cached"}).json()["id"]
+        prompt_id = client.post("/prompts", json=sample_prompt_data).json()["id"]
+        params = {"tag_ids": tag_id}
+        assert client.get("/prompts", params=params).json()["total"] == 0
+        client.post(f"/prompts/{prompt_id}/tags", json={"tag_ids": [tag_id]})
+        assert client.get("/prompts", params=params).json()["total"] == 1
+        client.delete(f"/tags/{tag_id}")
+        assert client.get("/prompts", params=params).json()["total"] == 0
+        assert client.get("/prompts").json()["prompts"][0]["tag_ids"] == []
+
+    def test_list_prompts_reflects_patch(self, client: TestClient, sample_prompt_data):
+        prompt_id = client.post("/prompts", json=sample_prompt_data).json()["id"]
+        assert client.get("/prompts").json()["prompts"][0]["title"] != "Patched"
+        client.patch(f"/prompts/{prompt_id}", json={"title": "Patched"})
+        assert client.get("/prompts").json()["prompts"][0]["title"] == "Patched"
+
+    def test_equivalent_list_queries_share_a_cache_entry(
+        self, client: TestClient, sample_prompt_data
+    ):
+        client.post("/prompts", json=sample_prompt_data)
+        _prompt_list_body.cache_clear()
+        for params in [
+            {},
+            {"tag_match": "any"},
+            {"tag_match": "random"},
+            {"tag_ids": ","},
+            {"tag_ids": " ", "tag_match": "any"},
+            {"search": "", "collection_id": ""},
+        ]:
+            assert client.get("/prompts", params=params).json()["total"] == 1
+        assert _prompt_list_body.cache_info().currsize == 1
+
+    def test_get_prompt_reflects_writes(self, client: TestClient, sample_prompt_data):
+        prompt_id = client.post("/prompts", json=sample_prompt_data).json()["id"]
+        assert client.get(f"/prompts/{prompt_id}").json()["tag_ids"] == []
+        tag_id = client.post("/tags", json={"name": "rev"}).json()["id"]
+        client.put(f"/prompts/{prompt_id}/tags", json={"tag_ids": [tag_id]})
+        assert client.get(f"/prompts/{prompt_id}").json()["tag_ids"] == [tag_id]
+        client.patch(f"/prompts/{prompt_id}", json={"title": "Revised"})
+        assert client.get(f"/prompts/{prompt_id}").json()["title"] == "Revised"
+        client.delete(f"/tags/{tag_id}")
+        assert client.get(f"/prompts/{prompt_id}").json()["tag_ids"] == []
+        client.delete(f"/prompts/{prompt_id}")
+        assert client.get(f"/prompts/{prompt_id}").status_code == 404
+
+    def test_get_collection_after_delete_returns_404(
+        self, client: TestClient, sample_collection_data
+    ):
+        col_response = client.post("/collections", json=sample_collection_data)
+        collection_id = col_response.json()["id"]
+        assert client.get(f"/collections/{collection_id}").status_code == 200
+        client.delete(f"/collections/{collection_id}")
+        assert client.get(f"/collections/{collection_id}").status_code == 404
+
+
+class TestResponseSerialization:
+    """Tests that read endpoints bypass FastAPI's response-model pass."""
+
+    def test_read_endpoints_skip_serialize_response(
+        self,
+        client: TestClient,
+        monkeypatch: pytest.MonkeyPatch,
+        sample_prompt_data,
+        sample_collection_data,
+    ):
+        prompt_id = client.post("/prompts", json=sample_prompt_data).json()["id"]
+        col_response = client.post("/collections", json=sample_collection_data)
+        collection_id = col_response.json()["id"]
+        tag_id = client.post("/tags", json={"name": "raw"}).json()["id"]
+
+        def fail(*args, **kwargs):
+            raise AssertionError("response model validation should be skipped")
+
+        monkeypatch.setattr("fastapi.routing.serialize_response", fail)
+        for path in [
+            "/prompts",
+            f"/prompts/{prompt_id}",
+            f"/prompts/{prompt_id}/tags",
+            "/collections",
+            f"/collections/{collection_id}",
+            "/tags",
+            f"/tags/{tag_id}",
+        ]:
+            response = client.get(path)
+            assert response.status_code == 200, path
+            assert response.headers["content-type"] == "application/json"
+
+    def test_list_entries_match_prompt_bodies(
+        self, client: TestClient, sample_prompt_data
+    ):
+        tag_id = client.post("/tags", json={"name": "raw"}).json()["id"]
+        client.post("/prompts", json={**sample_prompt_data, "tag_ids": [tag_id]})
+        for created_at in [
+            datetime(2024, 1, 1),
+            datetime(2024, 1, 2, 3, 4, 5, 6, tzinfo=timezone(timedelta(hours=5))),
+        ]:
+            storage.create_prompt(
+                Prompt(title="Ünïcode", content="Prompt content", created_at=created_at)
+            )
+        listed = client.get("/prompts").json()["prompts"]
+        assert len(listed) == 3
+        for entry in listed:
+            assert entry == client.get(f"/prompts/{entry['id']}").json()
+
+
+class TestCompression:
+    """Tests for gzip response compression."""
+
+    def test_large_list_is_gzipped(self, client: TestClient, sample_prompt_data):
+        for i in range(5):
+            client.post("/prompts", json={**sample_prompt_data, "title": f"P{i}"})
+        response = client.get("/prompts", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.json()["total"] == 5
+
+    def test_cached_body_is_compressed_once(
+        self, client: TestClient, monkeypatch: pytest.MonkeyPatch, sample_prompt_data
+    ):
+        for i in range(5):
+            client.post("/prompts", json={**sample_prompt_data, "title": f"P{i}"})
+        calls = []
+        compress = gzip.compress
+
+        def counting_compress(data, *args, **kwargs):
+            calls.append(len(data))
+            return compress(data, *args, **kwargs)
+
+        monkeypatch.setattr("app.api.gzip.compress", counting_compress)
+        for _ in range(3):
+            response = client.get("/prompts", headers={"Accept-Encoding": "gzip"})
+            assert response.headers["content-encoding"] == "gzip"
+            assert response.headers["vary"] == "Accept-Encoding"
+            assert response.json()["total"] == 5
+        assert len(calls) == 1
+        response = client.get("/prompts", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in response.headers
+        assert response.json()["total"] == 5
+
+    def test_small_response_is_not_compressed(self, client: TestClient):
+        response = client.get("/health", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+
+    def test_not_modified_with_gzip(self, client: TestClient, sample_prompt_data):
+        for i in range(5):
+            client.post("/prompts", json={**sample_prompt_data, "title": f"P{i}"})
+        etag = client.get("/prompts").headers["etag"]
+        response = client.get(
+            "/prompts", headers={"Accept-Encoding": "gzip", "If-None-Match": etag}
+        )
+        assert response.status_code == 304
+        assert "content-encoding" not in response.headers